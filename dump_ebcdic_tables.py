@@ -1,8 +1,13 @@
 from ctypes import c_char, c_int, c_uint, c_int16, c_uint16, \
                    c_size_t, c_ulonglong, c_void_p, c_char_p, \
-                   addressof, sizeof, create_string_buffer, \
+                   addressof, sizeof, create_string_buffer, memmove, \
                    CDLL, DEFAULT_MODE, POINTER, Structure
 
+from concurrent.futures import ProcessPoolExecutor
+
+import json
+import os
+import sys
 import unicodedata
 
 RTLD_MEMBER = 0x00040000
@@ -205,6 +210,11 @@ class IconvArglist(Structure):
         ('in_len', MemPointer),
         ('out_buf', MemPointer),
         ('out_len', MemPointer),
+        # Storage for the lengths pointed to by in_len and out_len. These
+        # must come after the arguments, since the ILE side reads those from
+        # the start of the arglist.
+        ('in_len_storage', c_uint),
+        ('out_len_storage', c_uint),
     ]
 
 
@@ -222,6 +232,14 @@ def load_symbol(library, srvpgm, symbol):
     return ptr
 
 
+# Resolved procedure and program pointers, loaded on first use
+_ERRNO_PTR = None
+_ICONV_OPEN_PTR = None
+_ICONV_CLOSE_PTR = None
+_ICONV_PTR = None
+_QTQGESP_PTR = None
+
+
 # actgrp = _ILELOADX(b"QSYS/QC2UTIL1", ILELOAD_LIBOBJ)
 # if actgrp == 0xffffffffffffffff:
 #     raise OSError("QC2UTIL1 not found")
@@ -247,10 +265,9 @@ def load_symbol(library, srvpgm, symbol):
 
 
 def get_ile_errno():
-    try:
-        ptr = get_ile_errno.ptr
-    except AttributeError:
-        ptr = get_ile_errno.ptr = load_symbol("QSYS", "QC2UTIL1", "__errno")
+    global _ERRNO_PTR
+    if _ERRNO_PTR is None:
+        _ERRNO_PTR = load_symbol("QSYS", "QC2UTIL1", "__errno")
 
     errnop = ILEPointer()
 
@@ -259,7 +276,8 @@ def get_ile_errno():
 
     signature = c_int16(ARG_END)
 
-    if _ILECALLX(ptr, addressof(arglist), signature, 16, ILECALL_EXCP_NOSIGNAL):
+    if _ILECALLX(_ERRNO_PTR, addressof(arglist), signature, 16,
+                 ILECALL_EXCP_NOSIGNAL):
         raise RuntimeError("Failed to call QtqIconvOpen with _ILECALL")
 
     errno_buf = create_string_buffer(4)
@@ -267,113 +285,165 @@ def get_ile_errno():
     _SETSPP(errnop_pase, errno_buf)
     _MEMCPY_WT2(errnop_pase, errnop, 4)
 
-    return int(errno_buf.raw.hex(), 16)
+    return int.from_bytes(errno_buf.raw, 'big')
+
+
+# Only the CCSIDs change between iconv_open() calls, so the conversion
+# descriptions, argument list and signature are allocated once
+_ICONV_OPEN_TO_CODE = qtqcode_t()
+_ICONV_OPEN_FROM_CODE = qtqcode_t(
+    0,
+    0,  # 0=default conversion, 57=enforced subset match, 102=best fit
+    0,  # don't return the number of substitution characters
+    0,  # don't reset the shift state at the start of iconv()
+    0,  # iconv() does not call strlen() on the input
+    0,  # iconv() doesn't error on DBCS in mixed
+)
+
+_ICONV_OPEN_TO_CODE_ADDR = addressof(_ICONV_OPEN_TO_CODE)
+_ICONV_OPEN_FROM_CODE_ADDR = addressof(_ICONV_OPEN_FROM_CODE)
+
+_ICONV_OPEN_ARGLIST = IconvOpenArglist()
+_ICONV_OPEN_ARGLIST_ADDR = addressof(_ICONV_OPEN_ARGLIST)
+
+_ICONV_OPEN_SIGNATURE = (c_int16 * 3)(
+        ARG_MEMPTR,
+        ARG_MEMPTR,
+        ARG_END
+)
 
 
 def iconv_open(out_ccsid, in_ccsid):
-    try:
-        ptr = iconv_open.ptr
-    except AttributeError:
-        ptr = iconv_open.ptr = load_symbol("QSYS", "QTQICONV", "QtqIconvOpen")
-
-    to_code = qtqcode_t(out_ccsid)
-    from_code = qtqcode_t(
-        in_ccsid,
-        0,  # 0=default conversion, 57=enforced subset match, 102=best fit
-        0,  # don't return the number of substitution characters
-        0,  # don't reset the shift state at the start of iconv()
-        0,  # iconv() does not call strlen() on the input
-        0,  # iconv() doesn't error on DBCS in mixed
-    )
+    global _ICONV_OPEN_PTR
+    if _ICONV_OPEN_PTR is None:
+        _ICONV_OPEN_PTR = load_symbol("QSYS", "QTQICONV", "QtqIconvOpen")
 
-    cd = iconv_t()
+    _ICONV_OPEN_TO_CODE.ccsid = out_ccsid
+    _ICONV_OPEN_FROM_CODE.ccsid = in_ccsid
 
-    arglist = IconvOpenArglist()
-    arglist.to_code.addr = addressof(to_code)
-    arglist.from_code.addr = addressof(from_code)
-    arglist.base.result.lo = addressof(cd)
+    cd = iconv_t()
 
-    signature = (c_int16 * 3)(
-            ARG_MEMPTR,
-            ARG_MEMPTR,
-            ARG_END
-    )
+    _ICONV_OPEN_ARGLIST.to_code.addr = _ICONV_OPEN_TO_CODE_ADDR
+    _ICONV_OPEN_ARGLIST.from_code.addr = _ICONV_OPEN_FROM_CODE_ADDR
+    _ICONV_OPEN_ARGLIST.base.result.lo = addressof(cd)
 
-    if _ILECALLX(ptr, addressof(arglist), signature, sizeof(cd),
-                 ILECALL_EXCP_NOSIGNAL):
+    if _ILECALLX(_ICONV_OPEN_PTR, _ICONV_OPEN_ARGLIST_ADDR,
+                 _ICONV_OPEN_SIGNATURE, sizeof(cd), ILECALL_EXCP_NOSIGNAL):
         raise RuntimeError("Failed to call QtqIconvOpen with _ILECALL")
 
     return cd
 
 
-def iconv_close(cd):
-    try:
-        ptr = iconv_close.ptr
-    except AttributeError:
-        ptr = iconv_close.ptr = load_symbol("QSYS", "QTQICONV", "iconv_close")
+_ICONV_CLOSE_ARGLIST = IconvCloseArglist()
+_ICONV_CLOSE_ARGLIST_ADDR = addressof(_ICONV_CLOSE_ARGLIST)
 
-    arglist = IconvCloseArglist()
-    arglist.cd = cd
+_ICONV_CLOSE_SIGNATURE = (c_int16 * 2)(
+    sizeof(iconv_t),
+    ARG_END
+)
 
-    signature = (c_int16 * 2)(
-        sizeof(cd),
-        ARG_END
-    )
 
-    if _ILECALLX(ptr, addressof(arglist), signature, RESULT_INT32, ILECALL_EXCP_NOSIGNAL):
+def iconv_close(cd):
+    global _ICONV_CLOSE_PTR
+    if _ICONV_CLOSE_PTR is None:
+        _ICONV_CLOSE_PTR = load_symbol("QSYS", "QTQICONV", "iconv_close")
+
+    _ICONV_CLOSE_ARGLIST.cd = cd
+
+    if _ILECALLX(_ICONV_CLOSE_PTR, _ICONV_CLOSE_ARGLIST_ADDR,
+                 _ICONV_CLOSE_SIGNATURE, RESULT_INT32, ILECALL_EXCP_NOSIGNAL):
         raise RuntimeError("Failed to call iconv_close with _ILECALL")
 
-    return arglist.base.result.hi
+    return _ICONV_CLOSE_ARGLIST.base.result.hi
+
+
+# iconv() is called with the same argument list, signature and buffers every
+# time, so they're only allocated once. The buffers are sized to convert the
+# whole DBCS code point range in one call: UTF-16 needs at most 4 bytes (a
+# surrogate pair) per input byte.
+_ICONV_IN = create_string_buffer(65536 * 2)
+_ICONV_IN_ADDR = addressof(_ICONV_IN)
+_ICONV_IN_PTR = ILEPointer()
+
+_ICONV_OUT = create_string_buffer(len(_ICONV_IN) * 4)
+_ICONV_OUT_ADDR = addressof(_ICONV_OUT)
+_ICONV_OUT_PTR = ILEPointer()
+
+_ICONV_ARGLIST = IconvArglist()
+_ICONV_ARGLIST_ADDR = addressof(_ICONV_ARGLIST)
+
+_ICONV_IN_PTR_ADDR = addressof(_ICONV_IN_PTR)
+_ICONV_IN_LEN_ADDR = _ICONV_ARGLIST_ADDR + IconvArglist.in_len_storage.offset
+_ICONV_OUT_PTR_ADDR = addressof(_ICONV_OUT_PTR)
+_ICONV_OUT_LEN_ADDR = _ICONV_ARGLIST_ADDR + IconvArglist.out_len_storage.offset
+
+_ICONV_SIGNATURE = (c_int16 * 6)(
+    sizeof(iconv_t),
+    ARG_MEMPTR,
+    ARG_MEMPTR,
+    ARG_MEMPTR,
+    ARG_MEMPTR,
+    ARG_END
+)
+
+
+# iconv() return code on error, ie. (size_t)-1 as a 32-bit value
+ICONV_ERROR = 0xffffffff
 
 
 def iconv(cd, data):
-    try:
-        ptr = iconv.ptr
-    except AttributeError:
-        ptr = iconv.ptr = load_symbol("QSYS", "QTQICONV", "iconv")
-
-    in_len = c_uint(len(data))
-    in_buf = create_string_buffer(data)
-    in_ptr = ILEPointer()
-
-    _SETSPP(in_ptr, addressof(in_buf))
-
-    out_len = c_uint(8)
-    out_buf = create_string_buffer(out_len.value)
-    out_ptr = ILEPointer()
-    _SETSPP(out_ptr, addressof(out_buf))
-
-    arglist = IconvArglist()
-    arglist.cd = cd
-    arglist.in_buf.addr = addressof(in_ptr)
-    arglist.in_len.addr = addressof(in_len)
-    arglist.out_buf.addr = addressof(out_ptr)
-    arglist.out_len.addr = addressof(out_len)
-
-    signature = (c_int16 * 6)(
-        sizeof(cd),
-        ARG_MEMPTR,
-        ARG_MEMPTR,
-        ARG_MEMPTR,
-        ARG_MEMPTR,
-        ARG_END
-    )
+    global _ICONV_PTR
+    if _ICONV_PTR is None:
+        _ICONV_PTR = load_symbol("QSYS", "QTQICONV", "iconv")
+
+    if len(data) > len(_ICONV_IN):
+        raise ValueError(f"Can't convert more than {len(_ICONV_IN)} bytes")
 
-    if _ILECALLX(ptr, addressof(arglist), signature, RESULT_UINT32, 0):
+    if isinstance(data, bytes):
+        # Read-only data like bytes has to be copied in to our own buffer
+        memmove(_ICONV_IN_ADDR, data, len(data))
+        in_addr = _ICONV_IN_ADDR
+    else:
+        # Writable buffers (bytearray, ctypes arrays, etc) can be passed to
+        # iconv directly without copying them
+        in_buf = (c_char * len(data)).from_buffer(data)
+        in_addr = addressof(in_buf)
+
+    _ICONV_ARGLIST.in_len_storage = len(data)
+    _ICONV_ARGLIST.out_len_storage = len(_ICONV_OUT)
+
+    # iconv advances the buffer pointers as it converts, so they have to be
+    # reset on every call
+    _SETSPP(_ICONV_IN_PTR, in_addr)
+    _SETSPP(_ICONV_OUT_PTR, _ICONV_OUT_ADDR)
+
+    _ICONV_ARGLIST.cd = cd
+    _ICONV_ARGLIST.in_buf.addr = _ICONV_IN_PTR_ADDR
+    _ICONV_ARGLIST.in_len.addr = _ICONV_IN_LEN_ADDR
+    _ICONV_ARGLIST.out_buf.addr = _ICONV_OUT_PTR_ADDR
+    _ICONV_ARGLIST.out_len.addr = _ICONV_OUT_LEN_ADDR
+
+    if _ILECALLX(_ICONV_PTR, _ICONV_ARGLIST_ADDR, _ICONV_SIGNATURE,
+                 RESULT_UINT32, 0):
         raise RuntimeError("Failed to call iconv with _ILECALL")
 
-    out_size = len(out_buf) - out_len.value
-    return arglist.base.result.hi, out_buf.raw[:out_size]
+    # Return the number of input bytes that weren't converted along with the
+    # output, so callers can tell if iconv stopped early
+    out_size = len(_ICONV_OUT) - _ICONV_ARGLIST.out_len_storage
+    return (
+        _ICONV_ARGLIST.base.result.hi,
+        _ICONV_ARGLIST.in_len_storage,
+        _ICONV_OUT[:out_size],
+    )
 
 
 def get_encoding_scheme(ccsid):
-    try:
-        ptr = get_encoding_scheme.ptr
-    except AttributeError:
+    global _QTQGESP_PTR
+    if _QTQGESP_PTR is None:
         ptr = ILEPointer()
         if _RSLOBJ2(ptr, RSLOBJ_TS_PGM, b"QTQGESP", b"QSYS"):
             raise OSError("Error resolving QTQGESP")
-        get_encoding_scheme.ptr = ptr
+        _QTQGESP_PTR = ptr
 
     ccsid1 = c_int(ccsid)
     n1 = c_int(2)
@@ -391,7 +461,7 @@ def get_encoding_scheme(ccsid):
         addressof(fb),
         0
     )
-    if _PGMCALL(ptr, addressof(args), PGMCALL_EXCP_NOSIGNAL):
+    if _PGMCALL(_QTQGESP_PTR, addressof(args), PGMCALL_EXCP_NOSIGNAL):
         raise OSError("_PGMCALL")
 
     if any(fb):
@@ -400,6 +470,50 @@ def get_encoding_scheme(ccsid):
     return es.value
 
 
+# Asking QTQGESP about every possible CCSID takes a long time, so the results
+# are saved here and reused on later runs. Delete it to query the system again.
+ES_CACHE_FILE = 'ccsid_es_cache.json'
+
+
+def get_encoding_schemes():
+    "Returns a dict mapping each valid CCSID to its encoding scheme"
+    try:
+        with open(ES_CACHE_FILE) as cache_file:
+            return {
+                int(ccsid): es
+                for ccsid, es in json.load(cache_file).items()
+            }
+    except FileNotFoundError:
+        pass
+    except (ValueError, AttributeError, TypeError):
+        # A damaged cache file (invalid JSON or not a dict of CCSIDs) is just
+        # ignored and rebuilt below
+        print(f"Ignoring invalid {ES_CACHE_FILE}")
+
+    schemes = {}
+    for ccsid in range(1, 65535):
+        es = get_encoding_scheme(ccsid)
+        if es != -1:
+            schemes[ccsid] = es
+
+    # Write to a temporary file first so that an interrupted run can't
+    # leave a partially written cache behind
+    tmp_file = ES_CACHE_FILE + '.tmp'
+    with open(tmp_file, 'w') as cache_file:
+        json.dump(schemes, cache_file)
+    os.replace(tmp_file, ES_CACHE_FILE)
+
+    return schemes
+
+
+# Every code point in order, used as the input for converting a whole table.
+# These are bytearrays so that iconv() can use them without making a copy.
+_SBCS_CODE_POINTS = bytearray(range(256))
+_DBCS_CODE_POINTS = bytearray(
+    b"".join(cp.to_bytes(2, byteorder='big') for cp in range(65536))
+)
+
+
 def dump_conv_table(ccsid, es):
     to_ccsid = 1200
     if ccsid == 57777:
@@ -418,49 +532,43 @@ def dump_conv_table(ccsid, es):
         max_cp = 65536
         cp_size = 2
 
-    table = [None] * max_cp
-    for cp in range(max_cp):
-        data = cp.to_bytes(cp_size, byteorder='big')
-        rc, out = iconv(cd, data)
+    # Convert every code point in a single iconv() call. Each code point
+    # normally maps to exactly one UTF-16 code unit, so if iconv converted all
+    # the input and the output comes back at that size we can split it up
+    # directly. Otherwise (conversion errors, multi-character mappings, etc)
+    # fall back to converting each code point individually so that we know
+    # which output belongs to which.
+    if cp_size == 1:
+        data = _SBCS_CODE_POINTS
+    else:
+        data = _DBCS_CODE_POINTS
+
+    rc, in_left, out = iconv(cd, data)
+    if rc != ICONV_ERROR and in_left == 0 and len(out) == max_cp * 2:
+        table = [out[i:i+2] for i in range(0, len(out), 2)]
+    else:
+        view = memoryview(data)
+        table = [None] * max_cp
+        for cp in range(max_cp):
+            rc, in_left, out = iconv(cd, view[cp*cp_size:(cp+1)*cp_size])
 
-        table[cp] = out
+            table[cp] = out
 
     iconv_close(cd)
 
     return table
 
 
-def write_conv_txt(table, file):
-    if len(table) == 256:
-        fmt_str = "0x{:02x}\t{}\t# {}"
-    else:
-        fmt_str = "0x{:04x}\t{}\t# {}"
+def get_name(c):
+    name = unicodedata.name(c, None)
+    if name is not None:
+        return name
 
-    for cp, out in enumerate(table):
-        try:
-            u = out.decode('utf-16be')
-            if '\ufffd' in u:
-                # skip unused code points which
-                # convert to a replacement character
-                continue
-        except UnicodeDecodeError:
-            print(f"Somehow got invalid UTF-16 for cp {cp:x}: {out.hex()}")
-            exit(1)
-
-        def get_name(c):
-            try:
-                return unicodedata.name(c)
-            except ValueError:
-                category = unicodedata.category(c)
-                if category == 'Cc':
-                    return '<control>'
-                else:
-                    return '<unknown>'
-
-        out_hex = " ".join(["0x"+out[i:i+2].hex() for i in range(0, len(out), 2)])
-        out_names = " + ".join([get_name(_) for _ in u])
-
-        print(fmt_str.format(cp, out_hex, out_names), file=file)
+    category = unicodedata.category(c)
+    if category == 'Cc':
+        return '<control>'
+    else:
+        return '<unknown>'
 
 
 CONTROL_CODES = {
@@ -504,7 +612,7 @@ CATEGORY_CLASS = {
 }
 
 
-INVARIANTS = [
+INVARIANTS = frozenset([
     chr(_)
     for _
     in list(range(0x41, 0x5b)) + list(range(0x61, 0x7b)) +
@@ -514,70 +622,66 @@ INVARIANTS = [
     "&", "*", "\"", "'", "(",
     ")", ",", "_", "-", ".",
     "/", ":", ";", "?",
-]
+])
 
 
-def write_conv_html(ccsid, table, file):
-    if len(table) != 256:
-        return
-    html = f"""
+HTML_HEADER = """
 <style>
-#ebcdic-table {{
+#ebcdic-table {
     text-align: center;
     font-size: large;
     border-collapse: collapse;
     color: black;
-}}
-th {{
+}
+th {
     font-weight: 700;
     width: 3em;
     background-color: #EEEEEE;
-}}
-.th {{
+}
+.th {
     font-weight: 700;
     width: 1.6em;
     background-color: #EEEEEE;
-}}
-.row {{
+}
+.row {
     height: 4em;
-}}
-.glyph {{
+}
+.glyph {
     line-height: 1.6;
-}}
-.control-code {{
+}
+.control-code {
     font-variant: small-caps;
     font-family: monospace;
     background-color: #F0FFF0;
-}}
-.space-separator {{
+}
+.space-separator {
     font-variant: small-caps;
     font-family: monospace;
     background-color: #F0FFF0;
-}}
-.symbol {{
+}
+.symbol {
     background-color: #FFFFD7;
-}}
-.punctuation {{
+}
+.punctuation {
     background-color: #F4F4FF;
-}}
-.number {{
+}
+.number {
     background-color: #FFF4F4;
-}}
-.normal {{
+}
+.normal {
     background-color: #FFFFFF;
-}}
-.invariant {{
+}
+.invariant {
     border: 2px solid;
-}}
-.unassigned {{
+}
+.unassigned {
     background-color: #EEEEEE;
-}}
+}
 </style>
 <table id="ebcdic-table" border="1" frame="box">
 """
-    print(html, file=file)
 
-    table_head = f"""
+HTML_TABLE_HEAD = """
 <tr>
     <th class='th'></th>
     <th>_0</th><th>_1</th><th>_2</th><th>_3</th>
@@ -586,57 +690,145 @@ th {{
     <th>_C</th><th>_D</th><th>_E</th><th>_F</th>
 </tr>
 """
-    print(table_head, file=file)
 
-    for i in range(0, 16):
-        print("<tr class='row'>", file=file)
+HTML_FOOTER = """
+</table>
+"""
 
-        for j in range(0, 17):
-            if j == 0:
-                print(f"<td class='th'>_{i:X}</td>", end=None, file=file)
-                continue
-            j -= 1
+HTML_CELL = (
+    "<td class=\"{cls}\">{contents}<br><small>{cp:04X}</small></td>\n"
+)
+
+HTML_UNASSIGNED_CELL = (
+    "<td class=\"normal\"><span class='unassigned'></span></td>\n"
+)
+
+
+def render_cell(u):
+    category = unicodedata.category(u)
+    if '\ufffd' in u:
+        # skip unused code points which
+        # convert to a replacement character
+        x = "<span class='unassigned'></span>"
+    elif category == 'Cc':
+        n = CONTROL_CODES.get(u, '')
+        x = f"<span class='glyph'>{n}</span>"
+    elif category == 'Zs':
+        n = SPACE.get(u, '')
+        x = f"<span class='glyph'>{n}</span>"
+    else:
+        x = f"<span class='glyph'>{u}</span>"
 
-            cp = i * 16 + j
-            out = table[cp]
+    cls = CATEGORY_CLASS.get(category, "normal")
 
-            u = out.decode('utf-16be')
+    if u in INVARIANTS:
+        cls += ' invariant'
 
-            category = unicodedata.category(u)
-            if '\ufffd' in u:
-                # skip unused code points which
-                # convert to a replacement character
-                x = "<span class='unassigned'></span>"
-            elif category == 'Cc':
-                n = CONTROL_CODES.get(u, '')
-                x = f"<span class='glyph'>{n}</span>"
-            elif category == 'Zs':
-                n = SPACE.get(u, '')
-                x = f"<span class='glyph'>{n}</span>"
-            else:
-                x = f"<span class='glyph'>{u}</span>"
-            x += f"<br><small>{ord(u):04X}</small>"
+    return HTML_CELL.format(cls=cls, contents=x, cp=ord(u))
 
-            cls = CATEGORY_CLASS.get(category, "normal")
 
-            if u in INVARIANTS:
-                cls += ' invariant'
+# Cache of UTF-16BE output -> (decoded string, character names), shared by
+# the tables of every CCSID since most of them map to the same characters
+_OUT_CACHE = {}
 
-            print(f"<td class=\"{cls}\">{x}</td>", end=None, file=file)
-        print("\n</tr>", file=file)
 
-    print(table_head, file=file)
+def describe_output(out):
+    try:
+        return _OUT_CACHE[out]
+    except KeyError:
+        pass
+
+    if len(out) == 2 and not 0xd8 <= out[0] <= 0xdf:
+        # Nearly everything maps to a single non-surrogate code unit, which
+        # is the character's code point
+        u = chr(out[0] << 8 | out[1])
+    else:
+        u = out.decode('utf-16be')
+    names = " + ".join([get_name(_) for _ in u])
 
-    html = f"""
-</table>
-"""
-    print(html, file=file)
+    entry = _OUT_CACHE[out] = (u, names)
+    return entry
 
 
-for ccsid in range(1, 65535):
-    es = get_encoding_scheme(ccsid)
-    if es not in (0x1100, 0x1200):
-        continue
+# Cache of decoded output -> rendered HTML table cell. This is separate from
+# _OUT_CACHE so that cells are only rendered for tables which get an HTML file.
+_CELL_CACHE = {}
+
+
+def cell_for(u):
+    try:
+        return _CELL_CACHE[u]
+    except KeyError:
+        pass
+
+    # The HTML tables only handle code points which map to a single
+    # character, anything else (eg. no output from a failed conversion) is
+    # shown as unassigned
+    if len(u) == 1:
+        cell = render_cell(u)
+    else:
+        cell = HTML_UNASSIGNED_CELL
+
+    _CELL_CACHE[u] = cell
+    return cell
+
+
+def emit_tables(table, txt_file, html_file=None):
+    if len(table) == 256:
+        fmt_str = "0x{:02x}\t{}\t# {}\n"
+    else:
+        fmt_str = "0x{:04x}\t{}\t# {}\n"
+
+    # Convert the whole table to hex at once and slice out each code point's
+    # part of it, rather than converting each one separately
+    table_hex = b"".join(table).hex()
+    start = 0
+
+    # Both tables are built up in the same pass over the code points
+    lines = []
+    if html_file is not None:
+        html = [HTML_HEADER, "\n", HTML_TABLE_HEAD, "\n"]
+
+    for cp, out in enumerate(table):
+        end = start + len(out) * 2
+        out_hex = table_hex[start:end]
+        start = end
+
+        try:
+            u, out_names = describe_output(out)
+        except UnicodeDecodeError:
+            print(f"Somehow got invalid UTF-16 for cp {cp:x}: {out_hex}")
+            exit(1)
+
+        if html_file is not None:
+            row, col = divmod(cp, 16)
+            if col == 0:
+                html.append(
+                    f"<tr class='row'>\n<td class='th'>_{row:X}</td>\n"
+                )
+            html.append(cell_for(u))
+            if col == 15:
+                html.append("\n</tr>\n")
+
+        if '\ufffd' in u:
+            # skip unused code points which
+            # convert to a replacement character
+            continue
+
+        out_hex = " ".join(
+            ["0x"+out_hex[i:i+4] for i in range(0, len(out_hex), 4)]
+        )
+
+        lines.append(fmt_str.format(cp, out_hex, out_names))
+
+    txt_file.write("".join(lines))
+
+    if html_file is not None:
+        html += [HTML_TABLE_HEAD, "\n", HTML_FOOTER, "\n"]
+        html_file.write("".join(html))
+
+
+def process_ccsid(ccsid, es):
     if ccsid == 57777:
         # For some reason the system claims this to be a DBCS CCSID, but jt400
         # treats it as SBCS and looking at the data that comes back, it does
@@ -648,10 +840,55 @@ for ccsid in range(1, 65535):
     table = dump_conv_table(ccsid, es)
     if table is None:
         print(f"Couldn't open converter for {ccsid}")
-        continue
-    with open(f'IBM-{ccsid:03d}.txt', 'w') as conv_file:
-        write_conv_txt(table, conv_file)
-    if es != 0x1200:
-        # TODO: Add support for generating DBCS html tables
-        with open(f'IBM-{ccsid:03d}.html', 'w') as conv_file:
-            write_conv_html(ccsid, table, conv_file)
+        return
+    with open(f'IBM-{ccsid:03d}.txt', 'w') as txt_file:
+        if es == 0x1200:
+            # TODO: Add support for generating DBCS html tables
+            emit_tables(table, txt_file)
+        else:
+            with open(f'IBM-{ccsid:03d}.html', 'w') as html_file:
+                emit_tables(table, txt_file, html_file)
+
+
+def _init_worker():
+    global _ERRNO_PTR, _ICONV_OPEN_PTR, _ICONV_CLOSE_PTR, _ICONV_PTR
+    global _QTQGESP_PTR
+
+    # ILE activations aren't inherited across fork, so each worker has to
+    # throw away anything the parent loaded and resolve the procedures itself.
+    # Load the iconv ones up front instead of on the first call to each one.
+    _ERRNO_PTR = None
+    _QTQGESP_PTR = None
+    _ICONV_OPEN_PTR = load_symbol("QSYS", "QTQICONV", "QtqIconvOpen")
+    _ICONV_PTR = load_symbol("QSYS", "QTQICONV", "iconv")
+    _ICONV_CLOSE_PTR = load_symbol("QSYS", "QTQICONV", "iconv_close")
+
+
+def main():
+    schemes = {
+        ccsid: es
+        for ccsid, es in get_encoding_schemes().items()
+        if es in (0x1100, 0x1200)
+    }
+
+    # Make sure nothing printed so far is still buffered when the workers are
+    # forked, so that they can't each print it again when they exit
+    sys.stdout.flush()
+
+    # Each CCSID is converted and written out independently, so spread them
+    # across a process per CPU
+    with ProcessPoolExecutor(initializer=_init_worker) as executor:
+        try:
+            # Consume the results so that any exceptions get raised here
+            for _ in executor.map(process_ccsid, schemes.keys(),
+                                  schemes.values()):
+                pass
+        except BaseException:
+            # Otherwise leaving the with block waits for every remaining
+            # CCSID to be processed before the error gets reported
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+
+
+if __name__ == '__main__':
+    main()